@@ -1,48 +1,132 @@
-from flask import Flask, jsonify
+import time
+_INICIO = time.perf_counter()
+
+import importlib
+import click
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from models import db
 from config import Config
+from services import instrumentacion, metricas, migraciones, serializacion
 
-# Importar blueprints
-from routes.clientes import clientes_bp
-from routes.tatuadores import tatuadores_bp
-from routes.citas import citas_bp
+ORIGENES = ["https://tatto-frontend-topaz.vercel.app"]
 
-app = Flask(__name__)
-app.config.from_object(Config)
-app.url_map.strict_slashes = False
+# Blueprints como (módulo, atributo, prefijo): se importan dentro de create_app()
+# para medir el costo de importación de cada uno. El registro es inmediato y no
+# diferido a la primera petición: con preload_app el master los importa una sola
+# vez antes del fork (~10 ms en total, ver /api/debug), mientras que diferirlos
+# haría pagar ese costo en la primera petición de cada worker, y url_for() necesita
+# los endpoints de todos los blueprints registrados desde el arranque
+BLUEPRINTS = [
+    ("routes.clientes", "clientes_bp", "/api/clientes"),
+    ("routes.tatuadores", "tatuadores_bp", "/api/tatuadores"),
+    ("routes.citas", "citas_bp", "/api/citas"),
+    ("routes.reportes", "reportes_bp", "/api/reportes"),
+    ("routes.imagenes", "imagenes_bp", "/api/imagenes"),
+]
 
-# ✅ Configuración CORS para producción
-CORS(app, origins=["https://tatto-frontend-topaz.vercel.app"])
+def create_app(config=Config):
+    inicio = time.perf_counter()
+    app = Flask(__name__)
+    app.config.from_object(config)
+    serializacion.init_app(app)
+    app.url_map.strict_slashes = False
 
-db.init_app(app)
+    # ✅ Configuración CORS para producción
+    CORS(
+        app,
+        origins=ORIGENES,
+        expose_headers=["X-Next-Cursor", "Link", "ETag"]
+    )
 
-# Registrar blueprints
-app.register_blueprint(clientes_bp, url_prefix="/api/clientes")
-app.register_blueprint(tatuadores_bp, url_prefix="/api/tatuadores")
-app.register_blueprint(citas_bp, url_prefix="/api/citas")
+    db.init_app(app)
 
-@app.route("/")
-def home():
-    return "✅ Flask está funcionando y conectado a la BD"
+    # Solo se crea el objeto Engine; la primera conexión se abre en el worker
+    # (post_fork en gunicorn.conf.py) para no compartir sockets entre procesos
+    with app.app_context():
+        app.extensions["pool_stats"] = instrumentacion.registrar_pool(db.engine)
+        metricas.init_app(app, db.engine, origenes=ORIGENES)
 
-@app.route("/api/health")
-def health():
-    return {"status": "ok"}
+    # Registrar blueprints
+    imports_ms = {}
+    for modulo, atributo, prefijo in BLUEPRINTS:
+        t = time.perf_counter()
+        blueprint = getattr(importlib.import_module(modulo), atributo)
+        imports_ms[modulo] = round((time.perf_counter() - t) * 1000, 2)
+        app.register_blueprint(blueprint, url_prefix=prefijo)
 
-@app.route("/api/debug")
-def debug():
-    return jsonify({
-        "rules": [str(rule) for rule in app.url_map.iter_rules()]
-    })
+    registrar_rutas_base(app)
 
-@app.route("/api/init-db")
-def init_db():
-    with app.app_context():
-        db.create_all()
-    return {"status": "Tablas creadas"}
+    app.extensions["arranque"] = {
+        "import_app_ms": round((inicio - _INICIO) * 1000, 2),
+        "imports_blueprints_ms": imports_ms,
+        "create_app_ms": round((time.perf_counter() - inicio) * 1000, 2),
+    }
+    app.logger.info("App creada: %s", app.extensions["arranque"])
+    return app
+
+def registrar_rutas_base(app):
+    @app.route("/")
+    def home():
+        return "✅ Flask está funcionando y conectado a la BD"
+
+    @app.route("/api/health")
+    def health():
+        inicio = time.perf_counter()
+        try:
+            db.session.execute(text("SELECT 1"))
+            status, codigo = "ok", 200
+        except SQLAlchemyError:
+            db.session.rollback()
+            status, codigo = "error", 503
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+
+        return {
+            "status": status,
+            "db": {
+                "latencia_ms": round(latencia_ms, 2),
+                "pool": instrumentacion.estado_pool(db.engine, app.extensions["pool_stats"])
+            }
+        }, codigo
+
+    @app.route("/api/metrics")
+    def metrics():
+        # Formato de texto de Prometheus; con METRICAS_DIR suma todos los workers
+        pool = instrumentacion.estado_pool(db.engine, app.extensions["pool_stats"])
+        extra = {
+            f"db_pool_{k}": v for k, v in pool.items() if isinstance(v, int)
+        }
+        return Response(
+            metricas.exportar(app, extra),
+            mimetype="text/plain; version=0.0.4"
+        )
+
+    @app.route("/api/debug")
+    def debug():
+        return jsonify({
+            "rules": [str(rule) for rule in app.url_map.iter_rules()],
+            "arranque": app.extensions["arranque"],
+            "migraciones_pendientes": migraciones.pendientes(db.engine)
+        })
+
+    @app.cli.command("migrar")
+    def migrar():
+        """Aplica las migraciones de esquema pendientes (fase release del deploy)."""
+        aplicadas = migraciones.migrar(db.engine, app.logger)
+        click.echo(f"✅ Migraciones aplicadas: {', '.join(aplicadas) if aplicadas else 'ninguna'}")
+
+def __getattr__(nombre):
+    # `from app import app` y `gunicorn app:app` crean la app en el primer acceso
+    if nombre == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(nombre)
 
 if __name__ == "__main__":
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        migraciones.migrar(db.engine, app.logger)
     app.run(debug=True)
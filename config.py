@@ -2,7 +2,62 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def opciones_engine(uri):
+    # Pool explícito y configurable por entorno en lugar de los defaults de SQLAlchemy
+    opciones = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true") == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+    if uri.startswith("sqlite"):
+        # timeout = espera máxima (s) por el lock de escritura de SQLite
+        opciones["connect_args"] = {"timeout": float(os.getenv("DB_BUSY_TIMEOUT", "5"))}
+        return opciones
+
+    opciones.update({
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        # LIFO reutiliza las conexiones calientes y deja expirar las sobrantes
+        "pool_use_lifo": True,
+    })
+    statement_timeout = os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000")
+    if uri.startswith("postgresql"):
+        opciones["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return opciones
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///local.db")
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_engine(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Conexiones que cada worker abre al arrancar para no pagarlas en la primera petición
+    DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "1"))
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-key")
+    REPORTES_CACHE_TTL = int(os.getenv("REPORTES_CACHE_TTL", "30"))
+    REPORTES_CACHE_MAX_ENTRADAS = int(os.getenv("REPORTES_CACHE_MAX_ENTRADAS", "256"))
+    # Jornada usada para calcular la disponibilidad de los tatuadores
+    HORARIO_APERTURA = os.getenv("HORARIO_APERTURA", "10:00")
+    HORARIO_CIERRE = os.getenv("HORARIO_CIERRE", "20:00")
+    DISPONIBILIDAD_MAX_DIAS = int(os.getenv("DISPONIBILIDAD_MAX_DIAS", "92"))
+    IMPORTACION_LOTE = int(os.getenv("IMPORTACION_LOTE", "1000"))
+    # "memoria" (LRU por worker) o "archivo" (compartido entre workers de la misma máquina)
+    CACHE_HTTP_BACKEND = os.getenv("CACHE_HTTP_BACKEND", "memoria")
+    CACHE_HTTP_DIR = os.getenv("CACHE_HTTP_DIR", "/tmp/tatto_cache_http")
+    CACHE_HTTP_MAX_ENTRADAS = int(os.getenv("CACHE_HTTP_MAX_ENTRADAS", "512"))
+    # Vida máxima de un ETag: acota lo que se sirve viejo tras escrituras fuera de la API
+    CACHE_HTTP_TTL = int(os.getenv("CACHE_HTTP_TTL", "300"))
+    # Log de peticiones lentas: umbral en ms y fracción de peticiones lentas que se registran
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    SLOW_REQUEST_SAMPLE = float(os.getenv("SLOW_REQUEST_SAMPLE", "1.0"))
+    # Directorio donde cada worker vuelca sus métricas para sumarlas en /api/metrics
+    METRICAS_DIR = os.getenv("METRICAS_DIR")
+    # "orjson" (si está instalado) o "default" (json de la librería estándar)
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+    # Imágenes de referencia: originales y miniaturas con nombre = hash del contenido
+    IMAGENES_DIR = os.path.join(BASE_DIR, os.getenv("STORAGE_DIR", "storage/uploads"))
+    # Origen público de las URLs de imágenes (p. ej. un CDN); sin definir se usa el host de la petición
+    IMAGENES_BASE_URL = os.getenv("IMAGENES_BASE_URL")
+    IMAGENES_MAX_BYTES = int(os.getenv("IMAGENES_MAX_BYTES", str(10 * 1024 * 1024)))
+    IMAGENES_MINIATURAS = [int(a) for a in os.getenv("IMAGENES_MINIATURAS", "320,800").split(",")]
+    IMAGENES_WORKERS = int(os.getenv("IMAGENES_WORKERS", "2"))
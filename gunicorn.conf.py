@@ -0,0 +1,41 @@
+import os
+
+# Configuración de gunicorn (Procfile: `gunicorn app:app -c gunicorn.conf.py`).
+# preload_app importa la app una sola vez en el master y los workers la heredan
+# por fork; cada worker abre sus propias conexiones a la BD en post_fork.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+
+# Con varios workers la caché HTTP en memoria no ve las invalidaciones de los demás,
+# y las métricas de cada uno se suman a través de archivos
+if workers > 1:
+    os.environ.setdefault("CACHE_HTTP_BACKEND", "archivo")
+    os.environ.setdefault("METRICAS_DIR", f"/tmp/tatto_metricas_{bind.rsplit(':', 1)[1]}")
+
+
+def on_starting(server):
+    # Las métricas empiezan de cero con cada arranque del master
+    import shutil
+    directorio = os.environ.get("METRICAS_DIR")
+    if directorio:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    from sqlalchemy.exc import SQLAlchemyError
+    from app import app
+    from models import db
+    from services import instrumentacion
+
+    with app.app_context():
+        # Las conexiones heredadas del master no se reutilizan ni se cierran desde el hijo
+        db.engine.dispose(close=False)
+        try:
+            instrumentacion.calentar_pool(db.engine, app.config["DB_POOL_WARM"])
+        except SQLAlchemyError:
+            worker.log.exception("No se pudo precalentar el pool de conexiones")
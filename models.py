@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import joinedload, raiseload
 
 db = SQLAlchemy()
 
@@ -32,6 +34,10 @@ class Tatuador(db.Model):
 
 class Cita(db.Model):
     __tablename__ = 'citas'
+    # Cubre la validación de solapamiento y la búsqueda de disponibilidad por tatuador y día
+    __table_args__ = (
+        db.Index('ix_citas_tatuador_fecha_hora', 'tatuador_id', 'fecha', 'hora_inicio'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.Date, nullable=False)
     hora_inicio = db.Column(db.Time, nullable=False)
@@ -44,8 +50,57 @@ class Cita(db.Model):
     cliente = db.relationship('Cliente', backref='citas')
     tatuador = db.relationship('Tatuador', backref='citas')
 
-    def to_dict(self):
-        return {
+    # Perfiles de carga: evitan el N+1 de las relaciones lazy en to_dict()
+    # "list":    cliente y tatuador en el mismo SELECT (JOIN)
+    # "compact": solo IDs; acceder a las relaciones lanza error en vez de consultar
+    PERFILES = {
+        "list": lambda: [joinedload(Cita.cliente), joinedload(Cita.tatuador)],
+        "compact": lambda: [raiseload(Cita.cliente), raiseload(Cita.tatuador)],
+    }
+
+    @classmethod
+    def consulta(cls, perfil="list"):
+        if perfil not in cls.PERFILES:
+            raise ValueError(f"Perfil de carga desconocido: {perfil}")
+        return cls.query.options(*cls.PERFILES[perfil]())
+
+    @staticmethod
+    def bloquear_agenda(tatuador_id):
+        # Serializa las reservas de un mismo tatuador entre workers hasta el commit/rollback,
+        # para que la validación de solapamiento y el INSERT sean atómicos.
+        if db.engine.dialect.name == "postgresql":
+            # Lock consultivo por tatuador: no bloquea la agenda de los demás
+            db.session.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext('citas'), :id)"),
+                {"id": tatuador_id}
+            )
+        else:
+            # SQLite no tiene locks por fila: una escritura vacía toma el lock de
+            # escritura de la BD, y los demás escritores esperan (busy timeout)
+            db.session.execute(
+                text("UPDATE tatuadores SET id = id WHERE id = :id"),
+                {"id": tatuador_id}
+            )
+
+    @classmethod
+    def solapada(cls, tatuador_id, fecha, hora_inicio, hora_fin, excluir_id=None):
+        query = cls.query.filter_by(tatuador_id=tatuador_id, fecha=fecha).filter(
+            cls.hora_inicio < hora_fin,
+            cls.hora_fin > hora_inicio
+        )
+        if excluir_id is not None:
+            query = query.filter(cls.id != excluir_id)
+        with db.session.no_autoflush:
+            return query.first()
+
+    def recargar(self, perfil="list"):
+        # Tras un commit la instancia queda expirada; populate_existing la recarga
+        # junto con sus relaciones en un solo SELECT (sin tocar self.id, que también dispararía uno)
+        id = inspect(self).identity[0]
+        return db.session.get(Cita, id, options=self.PERFILES[perfil](), populate_existing=True)
+
+    def to_dict(self, perfil="list"):
+        datos = {
             "id": self.id,
             "fecha": self.fecha.isoformat(),
             "hora_inicio": self.hora_inicio.isoformat(),
@@ -53,9 +108,9 @@ class Cita(db.Model):
             "descripcion": self.descripcion,
             "imagen_url": self.imagen_url,
             "cliente_id": self.cliente_id,
-            "tatuador_id": self.tatuador_id,
-            "cliente": self.cliente.to_dict(),
-            "tatuador": self.tatuador.to_dict()
+            "tatuador_id": self.tatuador_id
         }
-
-
+        if perfil != "compact":
+            datos["cliente"] = self.cliente.to_dict()
+            datos["tatuador"] = self.tatuador.to_dict()
+        return datos
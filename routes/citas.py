@@ -1,14 +1,42 @@
-from flask import Blueprint, request, jsonify, Response
-from models import db, Cita
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import func, select
+from models import db, Cita, Tatuador
+from services.consultas import (
+    ParametroInvalido, filtrar_fechas, leer_campos, leer_entero, paginar, respuesta_paginada
+)
+from services import cache_http, importacion, serializacion
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+import zlib
 
 citas_bp = Blueprint("citas", __name__)
 
 @citas_bp.route("/", methods=["GET"])
+@cache_http.cacheable("citas", "clientes", "tatuadores")
 def listar_citas():
-    citas = Cita.query.all()
-    return jsonify([c.to_dict() for c in citas])  # ✅ Usa to_dict()
+    perfil = request.args.get("perfil", "list")
+    if perfil not in Cita.PERFILES:
+        return jsonify({"error": f"Perfil desconocido: {perfil}"}), 400
+
+    try:
+        # Solo lectura: tuplas de columnas con JOIN, sin hidratar objetos del ORM
+        campos = leer_campos(Cita, request.args)
+        proyeccion = serializacion.plana(Cita, campos) if campos else serializacion.cita(perfil)
+        query = proyeccion.consulta(Cita)
+        tatuador_id = leer_entero(request.args, "tatuador_id")
+        cliente_id = leer_entero(request.args, "cliente_id")
+        if tatuador_id is not None:
+            query = query.filter(Cita.tatuador_id == tatuador_id)
+        if cliente_id is not None:
+            query = query.filter(Cita.cliente_id == cliente_id)
+        query = filtrar_fechas(query, Cita.fecha, request.args)
+        citas, siguiente = paginar(Cita, query, request.args)
+    except ParametroInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
+
+    return respuesta_paginada(citas, siguiente, proyeccion.construir, request)
 
 @citas_bp.route("/", methods=["POST"])
 def crear_cita():
@@ -28,18 +56,25 @@ def crear_cita():
     except ValueError:
         return jsonify({"error": "Formato de fecha u hora inválido"}), 400
 
-    # Validación de solapamiento
-    solapada = Cita.query.filter_by(tatuador_id=data["tatuador_id"], fecha=fecha).filter(
-        Cita.hora_inicio < hora_fin,
-        Cita.hora_fin > hora_inicio
-    ).first()
+    try:
+        cliente_id = int(data["cliente_id"])
+        tatuador_id = int(data["tatuador_id"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "cliente_id y tatuador_id deben ser enteros"}), 400
+
+    if hora_fin <= hora_inicio:
+        return jsonify({"error": "La hora de fin debe ser posterior a la de inicio"}), 400
 
+    # Validación de solapamiento bajo el lock de la agenda del tatuador
+    Cita.bloquear_agenda(tatuador_id)
+    solapada = Cita.solapada(tatuador_id, fecha, hora_inicio, hora_fin)
     if solapada:
+        db.session.rollback()
         return jsonify({"error": "El tatuador ya tiene una cita en ese horario"}), 409
 
     cita = Cita(
-        cliente_id=data["cliente_id"],
-        tatuador_id=data["tatuador_id"],
+        cliente_id=cliente_id,
+        tatuador_id=tatuador_id,
         fecha=fecha,
         hora_inicio=hora_inicio,
         hora_fin=hora_fin,
@@ -48,11 +83,13 @@ def crear_cita():
     )
     db.session.add(cita)
     db.session.commit()
+    cache_http.invalidar("citas")
+    cita = cita.recargar()
     return jsonify({"mensaje": "Cita creada", "cita": cita.to_dict()}), 201  # ✅ Devuelve objeto completo
 
 @citas_bp.route("/<int:id>", methods=["PUT"])
 def actualizar_cita(id):
-    cita = Cita.query.get_or_404(id)
+    cita = Cita.consulta("compact").get_or_404(id)
     if not request.is_json:
         return jsonify({"error": "Content-Type debe ser application/json"}), 400
 
@@ -68,9 +105,22 @@ def actualizar_cita(id):
     except ValueError:
         return jsonify({"error": "Formato de fecha u hora inválido"}), 400
 
+    if cita.hora_fin <= cita.hora_inicio:
+        db.session.rollback()
+        return jsonify({"error": "La hora de fin debe ser posterior a la de inicio"}), 400
+
+    # Validación de solapamiento con el nuevo horario (excluyendo la propia cita)
+    if any(k in data for k in ("fecha", "hora_inicio", "hora_fin")):
+        Cita.bloquear_agenda(cita.tatuador_id)
+        if Cita.solapada(cita.tatuador_id, cita.fecha, cita.hora_inicio, cita.hora_fin, excluir_id=id):
+            db.session.rollback()
+            return jsonify({"error": "El tatuador ya tiene una cita en ese horario"}), 409
+
     cita.descripcion = data.get("descripcion", cita.descripcion)
     cita.imagen_url = data.get("imagen_url", cita.imagen_url)
     db.session.commit()
+    cache_http.invalidar("citas")
+    cita = cita.recargar()
     return jsonify({"mensaje": "Cita actualizada", "cita": cita.to_dict()})  # ✅ Devuelve actualizado
 
 @citas_bp.route("/<int:id>", methods=["DELETE"])
@@ -78,50 +128,95 @@ def eliminar_cita(id):
     cita = Cita.query.get_or_404(id)
     db.session.delete(cita)
     db.session.commit()
+    cache_http.invalidar("citas")
     return jsonify({"mensaje": "Cita eliminada", "id": id})  # ✅ Devuelve ID eliminado
 
+@citas_bp.route("/bulk", methods=["POST"])
+def importar_citas():
+    return importacion.importar_desde_peticion(request, importacion.importar_citas, "citas")
+
+def xml_attr(valor):
+    return '"' + escape(valor, {'"': "&quot;", "\n": "&#10;"}) + '"'
+
+def xml_texto(etiqueta, valor):
+    if not valor:
+        return f"<{etiqueta} />"
+    return f"<{etiqueta}>{escape(valor)}</{etiqueta}>"
+
+def generar_reporte_xml(filas):
+    # filas: cursor de citas ordenado por tatuador_id, consumido de forma incremental.
+    # Cada fila trae su tatuador y los totales (funciones de ventana), así que el
+    # resumen, los encabezados y las citas salen de la misma sentencia y la misma
+    # instantánea de la BD: no pueden quedar citas sin encabezado ni al revés
+    filas = iter(filas)
+    fila = next(filas, None)
+    total_general = fila.total_general if fila is not None else 0
+    yield f"<reporte><resumen>{xml_texto('total_general', str(total_general))}</resumen>"
+
+    while fila is not None:
+        t = fila
+        yield (
+            f"<tatuador id={xml_attr(str(t.tatuador_id))} nombre={xml_attr(t.nombre)} estilo={xml_attr(t.estilo or '')}>"
+            f"{xml_texto('total_citas', str(t.total))}"
+            f"{xml_texto('porcentaje', f'{t.porcentaje:.2f}%')}"
+        )
+        while fila is not None and fila.tatuador_id == t.tatuador_id:
+            yield (
+                f"<cita id={xml_attr(str(fila.id))}>"
+                f"{xml_texto('cliente_id', str(fila.cliente_id))}"
+                f"{xml_texto('fecha', fila.fecha.isoformat())}"
+                f"{xml_texto('hora_inicio', fila.hora_inicio.strftime('%H:%M'))}"
+                f"{xml_texto('hora_fin', fila.hora_fin.strftime('%H:%M'))}"
+                f"{xml_texto('descripcion', fila.descripcion)}"
+                "</cita>"
+            )
+            fila = next(filas, None)
+        yield "</tatuador>"
+    yield "</reporte>"
+
+def comprimir_gzip(partes):
+    compresor = zlib.compressobj(wbits=31)  # wbits=31 -> formato gzip
+    for parte in partes:
+        datos = compresor.compress(parte.encode("utf-8"))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
 @citas_bp.route("/xml", methods=["GET"])
+@cache_http.cacheable("citas", "tatuadores", guardar_cuerpo=False)
 def exportar_citas_xml():
-    tatuadores_dict = {}
-    citas = Cita.query.all()
-    total_general = len(citas)
-
-    for c in citas:
-        t = c.tatuador
-        if t.id not in tatuadores_dict:
-            tatuadores_dict[t.id] = {
-                "nombre": t.nombre,
-                "estilo": t.estilo,
-                "citas": []
-            }
-        tatuadores_dict[t.id]["citas"].append(c)
-
-    root = ET.Element("reporte")
-    resumen_el = ET.SubElement(root, "resumen")
-    ET.SubElement(resumen_el, "total_general").text = str(total_general)
-
-    for tid, data in tatuadores_dict.items():
-        total_tatuador = len(data["citas"])
-        porcentaje = (total_tatuador / total_general * 100) if total_general > 0 else 0
-
-        tatuador_el = ET.SubElement(
-            root,
-            "tatuador",
-            id=str(tid),
-            nombre=data["nombre"],
-            estilo=data["estilo"] or ""
-        )
+    # Totales y porcentajes se calculan en la BD con funciones de ventana sobre
+    # las mismas filas que se exportan; las citas se leen con un cursor del lado
+    # del servidor y el XML se emite a medida que llegan las filas
+    total = func.count(Cita.id).over(partition_by=Cita.tatuador_id)
+    total_general = func.count(Cita.id).over()
+    citas = select(
+        Cita.id,
+        Cita.tatuador_id,
+        Cita.cliente_id,
+        Cita.fecha,
+        Cita.hora_inicio,
+        Cita.hora_fin,
+        Cita.descripcion,
+        Tatuador.nombre,
+        Tatuador.estilo,
+        total.label("total"),
+        total_general.label("total_general"),
+        (total * 100.0 / total_general).label("porcentaje")
+    ).join(Tatuador, Tatuador.id == Cita.tatuador_id).order_by(
+        Cita.tatuador_id, Cita.id
+    ).execution_options(yield_per=500)
 
-        ET.SubElement(tatuador_el, "total_citas").text = str(total_tatuador)
-        ET.SubElement(tatuador_el, "porcentaje").text = f"{porcentaje:.2f}%"
+    try:
+        citas = filtrar_fechas(citas, Cita.fecha, request.args)
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
 
-        for c in data["citas"]:
-            cita_el = ET.SubElement(tatuador_el, "cita", id=str(c.id))
-            ET.SubElement(cita_el, "cliente_id").text = str(c.cliente_id)
-            ET.SubElement(cita_el, "fecha").text = c.fecha.isoformat()
-            ET.SubElement(cita_el, "hora_inicio").text = c.hora_inicio.strftime("%H:%M")
-            ET.SubElement(cita_el, "hora_fin").text = c.hora_fin.strftime("%H:%M")
-            ET.SubElement(cita_el, "descripcion").text = c.descripcion or ""
+    partes = generar_reporte_xml(db.session.execute(citas))
 
-    xml_str = ET.tostring(root, encoding="utf-8", method="xml")
-    return Response(xml_str, mimetype="application/xml")
+    headers = {}
+    if request.args.get("gzip") in ("1", "true"):
+        partes = comprimir_gzip(partes)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(partes), mimetype="application/xml", headers=headers)
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import IntegrityError
 from models import db, Cliente
+from services.consultas import ParametroInvalido, leer_campos, paginar, respuesta_paginada
+from services import cache_http, importacion, serializacion
 
 clientes_bp = Blueprint("clientes", __name__)
 
@@ -9,9 +11,14 @@ def ping():
     return jsonify({"status": "clientes ok"})
 
 @clientes_bp.route("/", methods=["GET"])
+@cache_http.cacheable("clientes")
 def listar_clientes():
-    clientes = Cliente.query.all()
-    return jsonify([c.to_dict() for c in clientes])  # ✅ Usa to_dict()
+    try:
+        proyeccion = serializacion.plana(Cliente, leer_campos(Cliente, request.args))
+        clientes, siguiente = paginar(Cliente, proyeccion.consulta(Cliente), request.args)
+    except ParametroInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    return respuesta_paginada(clientes, siguiente, proyeccion.construir, request)
 
 @clientes_bp.route("/", methods=["POST"])
 def crear_cliente():
@@ -31,6 +38,7 @@ def crear_cliente():
         )
         db.session.add(cliente)
         db.session.commit()
+        cache_http.invalidar("clientes")
         return jsonify({"mensaje": "Cliente creado", "cliente": cliente.to_dict()}), 201  # ✅ Devuelve el objeto completo
     except IntegrityError:
         db.session.rollback()
@@ -48,6 +56,7 @@ def actualizar_cliente(id):
     cliente.telefono = data.get("telefono", cliente.telefono)
     try:
         db.session.commit()
+        cache_http.invalidar("clientes")
         return jsonify({"mensaje": "Cliente actualizado", "cliente": cliente.to_dict()})  # ✅ Devuelve actualizado
     except IntegrityError:
         db.session.rollback()
@@ -58,5 +67,13 @@ def eliminar_cliente(id):
     cliente = Cliente.query.get_or_404(id)
     db.session.delete(cliente)
     db.session.commit()
+    cache_http.invalidar("clientes")
     return jsonify({"mensaje": "Cliente eliminado", "id": id})  # ✅ Devuelve el ID eliminado
 
+@clientes_bp.route("/bulk", methods=["POST"])
+def importar_clientes():
+    # Con ?upsert=1 los emails existentes se actualizan en vez de reportarse como error
+    return importacion.importar_desde_peticion(
+        request, importacion.importar_clientes, "clientes",
+        upsert=request.args.get("upsert") in ("1", "true")
+    )
@@ -0,0 +1,72 @@
+import os
+import re
+from flask import Blueprint, current_app, request, jsonify, redirect, send_from_directory, url_for
+from werkzeug.security import safe_join
+from models import db, Cita
+from services import cache_http, imagenes
+
+imagenes_bp = Blueprint("imagenes", __name__)
+
+# Un año: los nombres son el hash del contenido, así que nunca cambian
+MAX_AGE = 365 * 24 * 3600
+MINIATURA = re.compile(r"^([0-9a-f]{64})_\d+\.webp$")
+
+def url_imagen(nombre):
+    base = current_app.config["IMAGENES_BASE_URL"]
+    if base:
+        return f"{base.rstrip('/')}{url_for('imagenes.servir_imagen', nombre=nombre)}"
+    return url_for("imagenes.servir_imagen", nombre=nombre, _external=True)
+
+@imagenes_bp.route("/", methods=["POST"])
+def subir_imagen():
+    # Cuerpo binario crudo (Content-Type: image/*), no multipart; ?cita_id= la asocia a una cita
+    cita_id = request.args.get("cita_id", type=int)
+    cita = Cita.query.get_or_404(cita_id) if cita_id else None
+
+    max_bytes = current_app.config["IMAGENES_MAX_BYTES"]
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({"error": f"La imagen supera el máximo de {max_bytes} bytes"}), 413
+
+    try:
+        digest, extension = imagenes.guardar_stream(request.stream, current_app.config["IMAGENES_DIR"], max_bytes)
+    except imagenes.ImagenInvalida as e:
+        return jsonify({"error": str(e)}), 400
+
+    url = url_imagen(f"{digest}.{extension}")
+    miniaturas = {}
+    if imagenes.encolar_miniaturas(current_app._get_current_object(), digest, extension):
+        miniaturas = {
+            str(ancho): url_imagen(imagenes.nombre_miniatura(digest, ancho))
+            for ancho in current_app.config["IMAGENES_MINIATURAS"]
+        }
+
+    if cita:
+        cita.imagen_url = url
+        db.session.commit()
+        cache_http.invalidar("citas")
+
+    return jsonify({"mensaje": "Imagen subida", "url": url, "miniaturas": miniaturas}), 201
+
+@imagenes_bp.route("/<nombre>", methods=["GET"])
+def servir_imagen(nombre):
+    directorio = current_app.config["IMAGENES_DIR"]
+    ruta = safe_join(directorio, nombre)
+    if ruta is None:
+        return jsonify({"error": "Nombre de archivo inválido"}), 400
+
+    if not os.path.exists(ruta):
+        # Miniatura aún en cola: se redirige al original sin cachear la redirección
+        pendiente = MINIATURA.match(nombre)
+        if pendiente:
+            for extension in imagenes.EXTENSIONES:
+                original = f"{pendiente.group(1)}.{extension}"
+                if os.path.exists(os.path.join(directorio, original)):
+                    resp = redirect(url_for("imagenes.servir_imagen", nombre=original))
+                    resp.headers["Cache-Control"] = "no-store"
+                    return resp
+        return jsonify({"error": "Imagen no encontrada"}), 404
+
+    resp = send_from_directory(directorio, nombre, max_age=MAX_AGE)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
@@ -0,0 +1,27 @@
+from flask import Blueprint, request, jsonify
+from services import reports
+
+reportes_bp = Blueprint("reportes", __name__)
+
+@reportes_bp.route("/citas", methods=["GET"])
+def citas_por_periodo():
+    periodo = request.args.get("periodo", "dia")
+    try:
+        return jsonify(reports.citas_por_periodo(periodo, request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@reportes_bp.route("/horas", methods=["GET"])
+def horas_ocupadas():
+    try:
+        return jsonify(reports.horas_ocupadas(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@reportes_bp.route("/franjas", methods=["GET"])
+def franjas_mas_ocupadas():
+    try:
+        limite = int(request.args.get("limite", 10))
+        return jsonify(reports.franjas_mas_ocupadas(request.args, limite))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
@@ -1,12 +1,21 @@
-from flask import Blueprint, request, jsonify
-from models import db, Tatuador
+from flask import Blueprint, current_app, request, jsonify
+from datetime import date, datetime, timedelta
+from models import db, Cita, Tatuador
+from services.consultas import ParametroInvalido, leer_campos, paginar, respuesta_paginada
+from services.disponibilidad import huecos_libres
+from services import cache_http, importacion, serializacion
 
 tatuadores_bp = Blueprint("tatuadores", __name__)
 
 @tatuadores_bp.route("/", methods=["GET"])
+@cache_http.cacheable("tatuadores")
 def listar_tatuadores():
-    tatuadores = Tatuador.query.all()
-    return jsonify([t.to_dict() for t in tatuadores])  # ✅ Usa to_dict()
+    try:
+        proyeccion = serializacion.plana(Tatuador, leer_campos(Tatuador, request.args))
+        tatuadores, siguiente = paginar(Tatuador, proyeccion.consulta(Tatuador), request.args)
+    except ParametroInvalido as e:
+        return jsonify({"error": str(e)}), 400
+    return respuesta_paginada(tatuadores, siguiente, proyeccion.construir, request)
 
 @tatuadores_bp.route("/", methods=["POST"])
 def crear_tatuador():
@@ -20,6 +29,7 @@ def crear_tatuador():
     tatuador = Tatuador(nombre=data["nombre"], estilo=data.get("estilo"))
     db.session.add(tatuador)
     db.session.commit()
+    cache_http.invalidar("tatuadores")
     return jsonify({"mensaje": "Tatuador creado", "tatuador": tatuador.to_dict()}), 201  # ✅ Devuelve objeto completo
 
 @tatuadores_bp.route("/<int:id>", methods=["PUT"])
@@ -32,6 +42,7 @@ def actualizar_tatuador(id):
     tatuador.nombre = data.get("nombre", tatuador.nombre)
     tatuador.estilo = data.get("estilo", tatuador.estilo)
     db.session.commit()
+    cache_http.invalidar("tatuadores")
     return jsonify({"mensaje": "Tatuador actualizado", "tatuador": tatuador.to_dict()})  # ✅ Devuelve actualizado
 
 @tatuadores_bp.route("/<int:id>", methods=["DELETE"])
@@ -39,4 +50,45 @@ def eliminar_tatuador(id):
     tatuador = Tatuador.query.get_or_404(id)
     db.session.delete(tatuador)
     db.session.commit()
+    cache_http.invalidar("tatuadores")
     return jsonify({"mensaje": "Tatuador eliminado", "id": id})  # ✅ Devuelve ID eliminado
+
+@tatuadores_bp.route("/<int:id>/disponibilidad", methods=["GET"])
+def disponibilidad_tatuador(id):
+    Tatuador.query.get_or_404(id)
+    try:
+        desde = request.args.get("desde")
+        desde = datetime.strptime(desde, "%Y-%m-%d").date() if desde else date.today()
+        hasta = request.args.get("hasta")
+        hasta = datetime.strptime(hasta, "%Y-%m-%d").date() if hasta else desde + timedelta(days=6)
+        apertura = datetime.strptime(current_app.config["HORARIO_APERTURA"], "%H:%M").time()
+        cierre = datetime.strptime(current_app.config["HORARIO_CIERRE"], "%H:%M").time()
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
+
+    if hasta < desde:
+        return jsonify({"error": "'hasta' debe ser posterior a 'desde'"}), 400
+    if (hasta - desde).days >= current_app.config["DISPONIBILIDAD_MAX_DIAS"]:
+        return jsonify({"error": "Rango de fechas demasiado amplio"}), 400
+
+    # Una sola consulta sobre el índice (tatuador_id, fecha, hora_inicio)
+    citas = db.session.query(Cita.fecha, Cita.hora_inicio, Cita.hora_fin).filter(
+        Cita.tatuador_id == id,
+        Cita.fecha >= desde,
+        Cita.fecha <= hasta
+    ).order_by(Cita.fecha, Cita.hora_inicio)
+
+    return jsonify({
+        "tatuador_id": id,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "libres": huecos_libres(citas, desde, hasta, apertura, cierre)
+    })
+
+@tatuadores_bp.route("/bulk", methods=["POST"])
+def importar_tatuadores():
+    # Con ?upsert=1 las filas con id de un tatuador existente lo actualizan
+    return importacion.importar_desde_peticion(
+        request, importacion.importar_tatuadores, "tatuadores",
+        upsert=request.args.get("upsert") in ("1", "true")
+    )
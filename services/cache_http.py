@@ -0,0 +1,213 @@
+import fcntl
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, make_response, request
+
+# Caché HTTP para los GET de lectura. Cada tabla tiene un contador de versión
+# que los handlers de escritura incrementan tras el commit; el ETag se deriva
+# de la URL completa y de las versiones de las tablas de las que depende la
+# respuesta, así que un cambio en cualquiera de ellas produce un ETag nuevo.
+# Los contadores no sobreviven a un reinicio del proceso (o a que se borre el
+# directorio), así que cada almacén tiene además una época aleatoria que se
+# crea junto con los contadores y entra en el ETag: tras un reinicio ningún
+# ETag anterior vuelve a coincidir. Las escrituras que no pasan por los
+# handlers (otro dyno, scripts, SQL manual) no incrementan nada, así que el
+# ETag incluye también una ventana de tiempo de CACHE_HTTP_TTL segundos: ningún
+# validador ni cuerpo guardado se sirve más allá de esa ventana.
+#
+# Backends (CACHE_HTTP_BACKEND):
+#   "memoria": LRU en el proceso; cada worker de gunicorn tiene el suyo
+#   "archivo": directorio local compartido por todos los workers de la máquina,
+#              con un subdirectorio por URL de BD
+
+HEADERS_GUARDADOS = ("X-Next-Cursor", "Link", "Content-Encoding", "Vary")
+
+
+class MemoriaLRU:
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._versiones = {}
+        self._lock = threading.Lock()
+        self.epoca = secrets.token_hex(8)
+
+    def version(self, tabla):
+        return self._versiones.get(tabla, 0)
+
+    def incrementar(self, tabla):
+        with self._lock:
+            self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def obtener(self, clave):
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+
+class ArchivoLocal:
+    def __init__(self, directorio, max_entradas):
+        self.max_entradas = max_entradas
+        self.directorio = directorio
+        self.dir_versiones = os.path.join(directorio, "versiones")
+        self.dir_entradas = os.path.join(directorio, "entradas")
+        for d in (directorio, self.dir_versiones, self.dir_entradas):
+            self.crear_directorio(d)
+        self.epoca = self.leer_epoca()
+        self._escrituras = 0
+
+    @staticmethod
+    def crear_directorio(directorio):
+        # El directorio puede estar en /tmp: debe ser privado y del usuario del proceso
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        info = os.lstat(directorio)
+        if not os.path.isdir(directorio) or os.path.islink(directorio) or info.st_uid != os.getuid():
+            raise RuntimeError(f"{directorio} no es un directorio propio del usuario del proceso")
+        if info.st_mode & 0o077:
+            os.chmod(directorio, 0o700)
+
+    def leer_epoca(self):
+        # El primer worker crea la época; os.link falla si otro se adelantó y
+        # entonces se usa la suya
+        ruta = os.path.join(self.dir_versiones, ".epoca")
+        fd, temporal = tempfile.mkstemp(dir=self.dir_versiones, prefix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(8))
+        try:
+            os.link(temporal, ruta)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporal)
+        with open(ruta) as f:
+            return f.read()
+
+    def version(self, tabla):
+        try:
+            with open(os.path.join(self.dir_versiones, tabla)) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return 0
+
+    def incrementar(self, tabla):
+        # flock serializa el incremento entre workers y os.replace hace que los
+        # lectores (sin lock) siempre vean una versión completa
+        with open(os.path.join(self.dir_versiones, f".{tabla}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.escribir(self.dir_versiones, tabla, str(self.version(tabla) + 1).encode())
+
+    def escribir(self, directorio, nombre, datos):
+        fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, os.path.join(directorio, nombre))
+
+    def obtener(self, clave):
+        # Formato: una línea JSON con mimetype y headers, seguida del cuerpo tal cual
+        try:
+            with open(os.path.join(self.dir_entradas, clave), "rb") as f:
+                meta = json.loads(f.readline())
+                return f.read(), meta["mimetype"], meta["headers"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def guardar(self, clave, valor):
+        cuerpo, mimetype, headers = valor
+        meta = json.dumps({"mimetype": mimetype, "headers": headers}).encode("utf-8")
+        # Escritura atómica: otro worker nunca lee un archivo a medio escribir
+        self.escribir(self.dir_entradas, clave, meta + b"\n" + cuerpo)
+
+        self._escrituras += 1
+        if self._escrituras % 50 == 0:
+            self.podar()
+
+    def podar(self):
+        # Las entradas de versiones viejas ya no se piden; se borran las menos recientes
+        entradas = sorted(
+            (e for e in os.scandir(self.dir_entradas) if not e.name.startswith(".")),
+            key=lambda e: e.stat().st_mtime
+        )
+        for e in entradas[:max(0, len(entradas) - self.max_entradas)]:
+            try:
+                os.remove(e.path)
+            except FileNotFoundError:
+                pass
+
+
+def obtener_backend():
+    app = current_app._get_current_object()
+    backend = app.extensions.get("cache_http")
+    if backend is None:
+        max_entradas = app.config["CACHE_HTTP_MAX_ENTRADAS"]
+        if app.config["CACHE_HTTP_BACKEND"] == "archivo":
+            # Apps con el mismo CACHE_HTTP_DIR y distinta BD no comparten versiones ni cuerpos
+            base = app.config["CACHE_HTTP_DIR"]
+            ArchivoLocal.crear_directorio(base)
+            uri = app.config["SQLALCHEMY_DATABASE_URI"]
+            directorio = os.path.join(base, hashlib.sha1(uri.encode("utf-8")).hexdigest()[:16])
+            backend = ArchivoLocal(directorio, max_entradas)
+        else:
+            backend = MemoriaLRU(max_entradas)
+        app.extensions["cache_http"] = backend
+    return backend
+
+
+def invalidar(*tablas):
+    # Llamar después del commit: si se incrementa antes, una lectura concurrente
+    # podría guardar datos viejos bajo la versión nueva
+    backend = obtener_backend()
+    for tabla in tablas:
+        backend.incrementar(tabla)
+
+
+def cacheable(*tablas, guardar_cuerpo=True):
+    # guardar_cuerpo=False para respuestas en streaming: solo ETag y 304
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            backend = obtener_backend()
+            versiones = ",".join(f"{t}:{backend.version(t)}" for t in tablas)
+            ventana = int(time.time() // current_app.config["CACHE_HTTP_TTL"])
+            etag = hashlib.sha1(
+                f"{request.full_path}|{backend.epoca}|{ventana}|{versiones}".encode("utf-8")
+            ).hexdigest()
+
+            if etag in request.if_none_match:
+                resp = Response(status=304)
+                resp.set_etag(etag)
+                resp.headers["Cache-Control"] = "no-cache"
+                return resp
+
+            guardada = backend.obtener(etag) if guardar_cuerpo else None
+            if guardada is not None:
+                cuerpo, mimetype, headers = guardada
+                resp = Response(cuerpo, mimetype=mimetype, headers=headers)
+            else:
+                resp = make_response(vista(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                if guardar_cuerpo and not resp.is_streamed:
+                    headers = {h: resp.headers[h] for h in HEADERS_GUARDADOS if h in resp.headers}
+                    backend.guardar(etag, (resp.get_data(), resp.mimetype, headers))
+
+            resp.set_etag(etag)
+            # no-cache: el navegador guarda la respuesta pero revalida siempre con If-None-Match
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return envoltura
+    return decorador
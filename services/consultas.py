@@ -0,0 +1,116 @@
+from datetime import date, datetime, time
+from urllib.parse import urlencode
+from itertools import islice
+from flask import Response, current_app, jsonify, stream_with_context
+
+# Paginación por cursor (keyset): cada página filtra por id > after_id y usa
+# el índice de la clave primaria, así que cuesta lo mismo sin importar la profundidad.
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+# Filas por lote del cursor; un listado sin paginar con más filas se envía en streaming
+LOTE_STREAMING = 1000
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def leer_entero(args, nombre):
+    valor = args.get(nombre)
+    if valor in (None, ""):
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ParametroInvalido(f"El parámetro '{nombre}' debe ser un entero")
+
+
+def leer_campos(modelo, args):
+    fields = args.get("fields")
+    if not fields:
+        return None
+
+    columnas = modelo.__table__.columns.keys()
+    campos = [f.strip() for f in fields.split(",") if f.strip()]
+    invalidos = [f for f in campos if f not in columnas]
+    if invalidos:
+        raise ParametroInvalido(f"Campos desconocidos: {', '.join(invalidos)}")
+
+    # El id siempre va primero porque es el cursor de la siguiente página
+    return ["id"] + [c for c in campos if c != "id"]
+
+
+def filtrar_fechas(query, columna, args):
+    # Acepta ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (ambos inclusivos); lanza ValueError si el formato es inválido
+    desde = args.get("desde")
+    hasta = args.get("hasta")
+    if desde:
+        query = query.filter(columna >= datetime.strptime(desde, "%Y-%m-%d").date())
+    if hasta:
+        query = query.filter(columna <= datetime.strptime(hasta, "%Y-%m-%d").date())
+    return query
+
+
+def valor_json(valor):
+    if isinstance(valor, (date, time)):
+        return valor.isoformat()
+    return valor
+
+
+def paginar(modelo, query, args):
+    # query selecciona tuplas de columnas cuya primera columna es modelo.id
+    after_id = leer_entero(args, "after_id")
+    limit = leer_entero(args, "limit")
+
+    paginado = after_id is not None or limit is not None
+    if paginado:
+        if limit is None:
+            limit = LIMITE_POR_DEFECTO
+        if limit < 1:
+            raise ParametroInvalido("El parámetro 'limit' debe ser mayor que 0")
+        limit = min(limit, LIMITE_MAXIMO)
+
+    query = query.order_by(modelo.id)
+    if after_id is not None:
+        query = query.filter(modelo.id > after_id)
+    if not paginado:
+        # Listado completo: se recorre con un cursor por lotes en vez de cargarlo entero
+        return query.yield_per(LOTE_STREAMING), None
+
+    # Se pide una fila extra para saber si existe otra página
+    filas = query.limit(limit + 1).all()
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        siguiente = filas[-1][0]
+    return filas, siguiente
+
+
+def respuesta_paginada(filas, siguiente, construir, request):
+    filas = iter(filas)
+    primeras = [construir(f) for f in islice(filas, LOTE_STREAMING)]
+
+    if len(primeras) < LOTE_STREAMING:
+        resp = jsonify(primeras)
+    else:
+        # Listado grande: se emite como un arreglo JSON por lotes sin armar el string completo
+        def dumps(lote):
+            return current_app.json.dumps(lote, separators=(",", ":"))
+
+        def generar():
+            yield "[" + dumps(primeras)[1:-1]
+            while True:
+                lote = [construir(f) for f in islice(filas, LOTE_STREAMING)]
+                if not lote:
+                    break
+                yield "," + dumps(lote)[1:-1]
+            yield "]"
+
+        resp = Response(stream_with_context(generar()), mimetype="application/json")
+
+    if siguiente is not None:
+        resp.headers["X-Next-Cursor"] = str(siguiente)
+        args = request.args.to_dict()
+        args["after_id"] = str(siguiente)
+        resp.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resp
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+
+def huecos_libres(citas, desde, hasta, apertura, cierre):
+    # Barrido lineal: las citas llegan ordenadas por (fecha, hora_inicio), así que
+    # basta un cursor por día que avanza hasta el fin de cada cita.
+    # citas: iterable de filas con fecha, hora_inicio y hora_fin
+    por_dia = {}
+    for c in citas:
+        por_dia.setdefault(c.fecha, []).append((c.hora_inicio, c.hora_fin))
+
+    huecos = []
+    dia = desde
+    while dia <= hasta:
+        cursor = apertura
+        for inicio, fin in por_dia.get(dia, []):
+            if inicio >= cierre:
+                break
+            if inicio > cursor:
+                huecos.append((dia, cursor, inicio))
+            if fin > cursor:
+                cursor = fin
+            if cursor >= cierre:
+                break
+        if cursor < cierre:
+            huecos.append((dia, cursor, cierre))
+        dia += timedelta(days=1)
+
+    return [
+        {
+            "fecha": fecha.isoformat(),
+            "hora_inicio": inicio.strftime("%H:%M"),
+            "hora_fin": fin.strftime("%H:%M")
+        }
+        for fecha, inicio, fin in huecos
+        if inicio < fin
+    ]
@@ -0,0 +1,130 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Pillow es opcional: sin él se guardan los originales pero no hay miniaturas.
+# Solo se comprueba que esté instalado; se importa en el hilo que genera las
+# miniaturas para no sumar su costo al arranque de la app
+PILLOW = importlib.util.find_spec("PIL") is not None
+
+# Imágenes de referencia de las citas. El cuerpo de la petición se copia a
+# disco por bloques mientras se calcula su SHA-256, que da el nombre final del
+# archivo (contenido inmutable => se puede cachear para siempre). Las
+# miniaturas se generan en un pool de hilos en segundo plano.
+
+BLOQUE = 64 * 1024
+
+# Firma (magic bytes) -> extensión; el Content-Type del cliente no es confiable
+FIRMAS = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+EXTENSIONES = ("jpg", "png", "gif", "webp")
+
+
+class ImagenInvalida(ValueError):
+    pass
+
+
+def detectar_extension(cabecera):
+    for firma, extension in FIRMAS:
+        if cabecera.startswith(firma):
+            return extension
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def guardar_stream(stream, directorio, max_bytes):
+    # Devuelve (hash, extensión) del archivo guardado como <hash>.<ext>
+    os.makedirs(directorio, exist_ok=True)
+    sha = hashlib.sha256()
+    total = 0
+    cabecera = b""
+
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".subida")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            while True:
+                bloque = stream.read(BLOQUE)
+                if not bloque:
+                    break
+                total += len(bloque)
+                if total > max_bytes:
+                    raise ImagenInvalida(f"La imagen supera el máximo de {max_bytes} bytes")
+                if len(cabecera) < 16:
+                    cabecera += bloque[:16]
+                sha.update(bloque)
+                destino.write(bloque)
+
+        extension = detectar_extension(cabecera)
+        if total == 0:
+            raise ImagenInvalida("El cuerpo de la petición está vacío")
+        if extension is None:
+            raise ImagenInvalida("Formato no soportado (se acepta JPEG, PNG, GIF o WebP)")
+
+        digest = sha.hexdigest()
+        # Si ya existe el mismo contenido, os.replace lo sobrescribe con bytes idénticos
+        os.replace(temporal, os.path.join(directorio, f"{digest}.{extension}"))
+        return digest, extension
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def nombre_miniatura(digest, ancho):
+    return f"{digest}_{ancho}.webp"
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool(workers):
+    # Se crea en el primer uso para que cada worker de gunicorn tenga su propio pool tras el fork
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miniaturas")
+        return _pool
+
+
+def generar_miniaturas(directorio, digest, extension, anchos, logger):
+    from PIL import Image
+    origen = os.path.join(directorio, f"{digest}.{extension}")
+    try:
+        with Image.open(origen) as imagen:
+            imagen.draft("RGB", (max(anchos), max(anchos)))  # decodificación reducida en JPEG
+            for ancho in anchos:
+                destino = os.path.join(directorio, nombre_miniatura(digest, ancho))
+                if os.path.exists(destino):
+                    continue
+                copia = imagen.copy()
+                copia.thumbnail((ancho, ancho * 4))
+                fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".miniatura")
+                with os.fdopen(fd, "wb") as f:
+                    copia.convert("RGB").save(f, "WEBP", quality=80)
+                os.replace(temporal, destino)
+    except Exception:
+        logger.exception("No se pudieron generar las miniaturas de %s", origen)
+
+
+def encolar_miniaturas(app, digest, extension):
+    if not PILLOW:
+        return False
+    pool = obtener_pool(app.config["IMAGENES_WORKERS"])
+    pool.submit(
+        generar_miniaturas,
+        app.config["IMAGENES_DIR"],
+        digest,
+        extension,
+        app.config["IMAGENES_MINIATURAS"],
+        app.logger
+    )
+    return True
@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from flask import current_app, jsonify
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+from models import db, Cita, Cliente, Tatuador
+from services import cache_http, reports
+
+# Importación masiva: las filas se leen en streaming (JSON, NDJSON o CSV), se
+# validan por lotes con una consulta IN por lote, se insertan con executemany
+# y cada lote se confirma en su propia transacción. Los errores se reportan por
+# fila (índice base 0 en el orden de entrada) sin abortar el resto del lote.
+
+
+def leer_filas(request):
+    # Los errores de lectura a mitad del cuerpo (UTF-8 o CSV inválidos) se
+    # convierten en ValueError: los lotes anteriores ya están confirmados y
+    # importar_desde_peticion los reporta junto con el error
+    try:
+        yield from leer_cuerpo(request)
+    except UnicodeDecodeError:
+        raise ValueError("El cuerpo de la petición no es UTF-8 válido")
+    except csv.Error as e:
+        raise ValueError(f"CSV mal formado: {e}")
+
+
+def leer_cuerpo(request):
+    tipo = request.mimetype
+    if tipo == "application/json":
+        datos = request.get_json()
+        if not isinstance(datos, list):
+            raise ValueError("Se esperaba un arreglo JSON")
+        yield from datos
+    elif tipo in ("application/x-ndjson", "application/jsonl"):
+        for linea in io.TextIOWrapper(request.stream, encoding="utf-8"):
+            if not linea.strip():
+                continue
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                # Una línea mal formada se reporta como error de esa fila
+                yield None
+    elif tipo == "text/csv":
+        for fila in csv.DictReader(io.TextIOWrapper(request.stream, encoding="utf-8")):
+            # En CSV una celda vacía equivale a un campo ausente
+            yield {k: v for k, v in fila.items() if v not in ("", None)}
+    else:
+        raise ValueError("Content-Type debe ser application/json, application/x-ndjson o text/csv")
+
+
+def en_lotes(filas):
+    tamano = current_app.config["IMPORTACION_LOTE"]
+    lote = []
+    for indice, fila in enumerate(filas):
+        lote.append((indice, fila))
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.errores = []
+        self.inicio = time.perf_counter()
+
+    def error(self, indice, mensaje):
+        self.errores.append({"fila": indice, "error": mensaje})
+
+    def to_dict(self):
+        segundos = time.perf_counter() - self.inicio
+        procesadas = self.insertados + self.actualizados + len(self.errores)
+        return {
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "errores": sorted(self.errores, key=lambda e: e["fila"]),
+            "segundos": round(segundos, 3),
+            "filas_por_segundo": round(procesadas / segundos, 1) if segundos > 0 else None
+        }
+
+
+def guardar(modelo, nuevos, cambios, resultado):
+    # nuevos y cambios: listas de (índice, datos). El lote va en un SAVEPOINT; si
+    # la BD lo rechaza (un email insertado por otra petición entre la consulta IN
+    # y el INSERT, un texto demasiado largo en PostgreSQL) se repite fila por
+    # fila sin soltar los locks de la transacción y solo fallan esas filas
+    try:
+        with db.session.begin_nested():
+            if nuevos:
+                db.session.execute(insert(modelo), [datos for _, datos in nuevos])
+            if cambios:
+                # Bulk UPDATE por clave primaria (executemany)
+                db.session.execute(update(modelo), [datos for _, datos in cambios])
+        resultado.insertados += len(nuevos)
+        resultado.actualizados += len(cambios)
+    except (DataError, IntegrityError):
+        resultado.insertados += sum(guardar_fila(insert(modelo), i, d, resultado) for i, d in nuevos)
+        resultado.actualizados += sum(guardar_fila(update(modelo), i, d, resultado) for i, d in cambios)
+    db.session.commit()
+    if modelo in (Cita, Tatuador) and (nuevos or cambios):
+        # Los INSERT/UPDATE masivos no pasan por el flush que marca los reportes como viejos
+        reports.cache.invalidar()
+
+
+def guardar_fila(sentencia, indice, datos, resultado):
+    try:
+        with db.session.begin_nested():
+            db.session.execute(sentencia, [datos])
+        return True
+    except IntegrityError:
+        resultado.error(indice, "La fila viola una restricción de la BD (p. ej. email duplicado)")
+    except DataError:
+        resultado.error(indice, "Valor no válido para la BD (p. ej. texto demasiado largo)")
+    return False
+
+
+def entero(valor):
+    # int() aceptaría True, 1.9 o "1": de JSON solo valen enteros y de CSV, texto con dígitos
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        raise ValueError(f"No es un entero: {valor!r}")
+    return int(valor)
+
+
+def campos_no_texto(fila, campos):
+    return [k for k in campos if fila.get(k) is not None and not isinstance(fila[k], str)]
+
+
+def importar_desde_peticion(request, importar, tabla, **opciones):
+    # Acepta un arreglo JSON, NDJSON (application/x-ndjson) o CSV (text/csv)
+    resultado = ResultadoImportacion()
+    try:
+        importar(leer_filas(request), resultado, **opciones)
+    except ValueError as e:
+        # El lote en curso se descarta; los anteriores ya confirmados se reportan
+        db.session.rollback()
+        return jsonify({"error": str(e), **resultado.to_dict()}), 400
+    finally:
+        # Los lotes ya confirmados cuentan aunque la importación se corte a mitad
+        cache_http.invalidar(tabla)
+    return jsonify(resultado.to_dict()), 207 if resultado.errores else 201
+
+
+def importar_clientes(filas, resultado, upsert=False):
+    for lote in en_lotes(filas):
+        validos = []
+        vistos = set()
+        for indice, fila in lote:
+            if not isinstance(fila, dict):
+                resultado.error(indice, "La fila debe ser un objeto JSON válido")
+                continue
+            missing = [k for k in ["nombre", "email"] if not fila.get(k)]
+            if missing:
+                resultado.error(indice, f"Faltan campos requeridos: {', '.join(missing)}")
+                continue
+            invalidos = campos_no_texto(fila, ["nombre", "email", "telefono"])
+            if invalidos:
+                resultado.error(indice, f"Deben ser texto: {', '.join(invalidos)}")
+                continue
+            if fila["email"] in vistos:
+                resultado.error(indice, "Email duplicado en la importación")
+                continue
+            vistos.add(fila["email"])
+            validos.append((indice, {
+                "nombre": fila["nombre"],
+                "email": fila["email"],
+                "telefono": fila.get("telefono")
+            }))
+
+        # Unicidad de email: una sola consulta IN por lote
+        existentes = dict(
+            db.session.query(Cliente.email, Cliente.id).filter(Cliente.email.in_(vistos))
+        ) if vistos else {}
+
+        nuevos, cambios = [], []
+        for indice, datos in validos:
+            if datos["email"] not in existentes:
+                nuevos.append((indice, datos))
+            elif upsert:
+                cambios.append((indice, {"id": existentes[datos["email"]], **datos}))
+            else:
+                resultado.error(indice, "Email ya existe")
+        guardar(Cliente, nuevos, cambios, resultado)
+    return resultado
+
+
+def importar_tatuadores(filas, resultado, upsert=False):
+    for lote in en_lotes(filas):
+        validos = []
+        for indice, fila in lote:
+            if not isinstance(fila, dict):
+                resultado.error(indice, "La fila debe ser un objeto JSON válido")
+                continue
+            if not fila.get("nombre"):
+                resultado.error(indice, "El campo 'nombre' es obligatorio")
+                continue
+            invalidos = campos_no_texto(fila, ["nombre", "estilo"])
+            if invalidos:
+                resultado.error(indice, f"Deben ser texto: {', '.join(invalidos)}")
+                continue
+            try:
+                id = entero(fila["id"]) if fila.get("id") is not None else None
+            except ValueError:
+                resultado.error(indice, "El campo 'id' debe ser un entero")
+                continue
+            if id is not None and not upsert:
+                resultado.error(indice, "El campo 'id' solo se acepta con ?upsert=1")
+                continue
+            validos.append((indice, id, {"nombre": fila["nombre"], "estilo": fila.get("estilo")}))
+
+        # Con ?upsert=1 las filas con id de un tatuador existente se actualizan
+        ids = {id for _, id, _ in validos if id is not None}
+        existentes = {
+            id for (id,) in db.session.query(Tatuador.id).filter(Tatuador.id.in_(ids))
+        } if ids else set()
+
+        nuevos, cambios = [], []
+        for indice, id, datos in validos:
+            if id in existentes:
+                cambios.append((indice, {"id": id, **datos}))
+            elif id is not None:
+                resultado.error(indice, f"No existe el tatuador {id}")
+            else:
+                nuevos.append((indice, datos))
+        guardar(Tatuador, nuevos, cambios, resultado)
+    return resultado
+
+
+def parsear_cita(fila):
+    required = ["fecha", "hora_inicio", "hora_fin", "cliente_id", "tatuador_id"]
+    missing = [k for k in required if not fila.get(k)]
+    if missing:
+        raise ValueError(f"Faltan campos requeridos: {', '.join(missing)}")
+    try:
+        fecha = datetime.strptime(fila["fecha"], "%Y-%m-%d").date()
+        hora_inicio = datetime.strptime(fila["hora_inicio"], "%H:%M").time()
+        hora_fin = datetime.strptime(fila["hora_fin"], "%H:%M").time()
+    except (TypeError, ValueError):
+        raise ValueError("Formato de fecha u hora inválido")
+    if hora_fin <= hora_inicio:
+        raise ValueError("La hora de fin debe ser posterior a la de inicio")
+    try:
+        cliente_id = entero(fila["cliente_id"])
+        tatuador_id = entero(fila["tatuador_id"])
+    except ValueError:
+        raise ValueError("cliente_id y tatuador_id deben ser enteros")
+    invalidos = campos_no_texto(fila, ["descripcion", "imagen_url"])
+    if invalidos:
+        raise ValueError(f"Deben ser texto: {', '.join(invalidos)}")
+    return {
+        "fecha": fecha,
+        "hora_inicio": hora_inicio,
+        "hora_fin": hora_fin,
+        "cliente_id": cliente_id,
+        "tatuador_id": tatuador_id,
+        "descripcion": fila.get("descripcion"),
+        "imagen_url": fila.get("imagen_url")
+    }
+
+
+def importar_citas(filas, resultado):
+    for lote in en_lotes(filas):
+        validos = []
+        for indice, fila in lote:
+            if not isinstance(fila, dict):
+                resultado.error(indice, "La fila debe ser un objeto JSON válido")
+                continue
+            try:
+                validos.append((indice, parsear_cita(fila)))
+            except ValueError as e:
+                resultado.error(indice, str(e))
+
+        tatuadores = {d["tatuador_id"] for _, d in validos}
+        clientes = {d["cliente_id"] for _, d in validos}
+        fechas = {d["fecha"] for _, d in validos}
+
+        # Locks de agenda en orden fijo para que dos importaciones no se bloqueen mutuamente
+        for tatuador_id in sorted(tatuadores):
+            Cita.bloquear_agenda(tatuador_id)
+
+        tatuadores_ok = {
+            id for (id,) in db.session.query(Tatuador.id).filter(Tatuador.id.in_(tatuadores))
+        } if tatuadores else set()
+        clientes_ok = {
+            id for (id,) in db.session.query(Cliente.id).filter(Cliente.id.in_(clientes))
+        } if clientes else set()
+
+        # Agenda ocupada de los tatuadores y días del lote, en una sola consulta
+        ocupadas = {}
+        if tatuadores:
+            existentes = db.session.query(
+                Cita.tatuador_id, Cita.fecha, Cita.hora_inicio, Cita.hora_fin
+            ).filter(Cita.tatuador_id.in_(tatuadores), Cita.fecha.in_(fechas))
+            for c in existentes:
+                ocupadas.setdefault((c.tatuador_id, c.fecha), []).append((c.hora_inicio, c.hora_fin))
+
+        nuevos = []
+        for indice, datos in validos:
+            if datos["tatuador_id"] not in tatuadores_ok:
+                resultado.error(indice, f"No existe el tatuador {datos['tatuador_id']}")
+                continue
+            if datos["cliente_id"] not in clientes_ok:
+                resultado.error(indice, f"No existe el cliente {datos['cliente_id']}")
+                continue
+            agenda = ocupadas.setdefault((datos["tatuador_id"], datos["fecha"]), [])
+            if any(inicio < datos["hora_fin"] and fin > datos["hora_inicio"] for inicio, fin in agenda):
+                resultado.error(indice, "El tatuador ya tiene una cita en ese horario")
+                continue
+            agenda.append((datos["hora_inicio"], datos["hora_fin"]))
+            nuevos.append((indice, datos))
+        guardar(Cita, nuevos, [], resultado)
+    return resultado
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class ContadorConsultas:
+    def __init__(self):
+        self.sentencias = []
+
+    @property
+    def total(self):
+        return len(self.sentencias)
+
+
+@contextmanager
+def contar_consultas(engine):
+    contador = ContadorConsultas()
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        contador.sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield contador
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+@contextmanager
+def assert_num_consultas(engine, esperado):
+    # Uso: with assert_num_consultas(db.engine, 1): client.get("/api/citas/")
+    with contar_consultas(engine) as contador:
+        yield contador
+    if contador.total != esperado:
+        detalle = "\n".join(contador.sentencias)
+        raise AssertionError(
+            f"Se esperaban {esperado} consultas SQL y se ejecutaron {contador.total}:\n{detalle}"
+        )
+
+
+class EstadisticasPool:
+    def __init__(self):
+        self.conexiones_nuevas = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidadas = 0
+
+
+def registrar_pool(engine):
+    stats = EstadisticasPool()
+
+    # Los contadores son por worker; += sobre un int es suficiente para métricas
+    @event.listens_for(engine, "connect")
+    def al_conectar(dbapi_conn, registro):
+        stats.conexiones_nuevas += 1
+
+    @event.listens_for(engine, "checkout")
+    def al_prestar(dbapi_conn, registro, proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def al_devolver(dbapi_conn, registro):
+        stats.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def al_invalidar(dbapi_conn, registro, excepcion):
+        stats.invalidadas += 1
+
+    return stats
+
+
+def estado_pool(engine, stats):
+    pool = engine.pool
+    estado = {
+        "clase": type(pool).__name__,
+        "conexiones_nuevas": stats.conexiones_nuevas,
+        "checkouts": stats.checkouts,
+        "checkins": stats.checkins,
+        "invalidadas": stats.invalidadas,
+    }
+    # size/checkedout/overflow solo existen en QueuePool
+    for nombre in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, nombre):
+            estado[nombre] = getattr(pool, nombre)()
+    return estado
+
+
+def calentar_pool(engine, cantidad):
+    # Abre y devuelve al pool `cantidad` conexiones para que la primera petición no pague el connect
+    conexiones = [engine.connect() for _ in range(cantidad)]
+    for conexion in conexiones:
+        conexion.close()
@@ -0,0 +1,228 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Métricas por worker: latencia por ruta (histograma), número y tiempo de
+# sentencias SQL (eventos del engine) y tamaño de las respuestas. Se exportan
+# en formato de texto de Prometheus y cada respuesta lleva un header
+# Server-Timing con el tiempo total y el de BD.
+#
+# Con varios workers (METRICAS_DIR definido) cada uno vuelca su estado a
+# <METRICAS_DIR>/<pid>.json cada VOLCADO_SEGUNDOS y /api/metrics suma los
+# archivos de todos, así los contadores no saltan según el worker que atienda
+# el scrape. Los archivos de workers que ya terminaron se conservan para que
+# los contadores nunca bajen; gunicorn vacía el directorio al arrancar.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+VOLCADO_SEGUNDOS = 1.0
+
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.cuentas[i] += 1
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}   # (método, ruta) -> Histograma
+        self.peticiones = {}  # (método, ruta, status) -> total
+        self.bytes = {}       # (método, ruta) -> [suma, total]
+        self.sql = {}         # (método, ruta) -> [sentencias, segundos]
+
+    def registrar(self, metodo, ruta, status, segundos, tamano, sentencias, segundos_sql):
+        clave = (metodo, ruta)
+        with self._lock:
+            self.latencias.setdefault(clave, Histograma()).observar(segundos)
+            clave_status = (metodo, ruta, status)
+            self.peticiones[clave_status] = self.peticiones.get(clave_status, 0) + 1
+            if tamano is not None:
+                acumulado = self.bytes.setdefault(clave, [0, 0])
+                acumulado[0] += tamano
+                acumulado[1] += 1
+            acumulado = self.sql.setdefault(clave, [0, 0.0])
+            acumulado[0] += sentencias
+            acumulado[1] += segundos_sql
+
+    def estado(self):
+        # Las claves son tuplas: se serializan como listas [clave, valor]
+        with self._lock:
+            return {
+                "latencias": [[k, [h.cuentas, h.suma, h.total]] for k, h in self.latencias.items()],
+                "peticiones": [[k, v] for k, v in self.peticiones.items()],
+                "bytes": [[k, v] for k, v in self.bytes.items()],
+                "sql": [[k, v] for k, v in self.sql.items()],
+            }
+
+    def sumar(self, estado):
+        with self._lock:
+            for clave, (cuentas, suma, total) in estado["latencias"]:
+                h = self.latencias.setdefault(tuple(clave), Histograma())
+                h.cuentas = [a + b for a, b in zip(h.cuentas, cuentas)]
+                h.suma += suma
+                h.total += total
+            for clave, total in estado["peticiones"]:
+                clave = tuple(clave)
+                self.peticiones[clave] = self.peticiones.get(clave, 0) + total
+            for nombre in ("bytes", "sql"):
+                acumulados = getattr(self, nombre)
+                for clave, (a, b) in estado[nombre]:
+                    acumulado = acumulados.setdefault(tuple(clave), [0, 0])
+                    acumulado[0] += a
+                    acumulado[1] += b
+
+    def exportar(self, extra=None, worker=None):
+        lineas = []
+
+        def etiquetas(metodo, ruta, **otras):
+            pares = {"method": metodo, "route": ruta, **otras}
+            return ",".join(f'{k}="{v}"' for k, v in pares.items())
+
+        with self._lock:
+            lineas.append("# TYPE http_requests_total counter")
+            for (metodo, ruta, status), total in sorted(self.peticiones.items()):
+                lineas.append(f"http_requests_total{{{etiquetas(metodo, ruta, status=status)}}} {total}")
+
+            lineas.append("# TYPE http_request_duration_seconds histogram")
+            for (metodo, ruta), h in sorted(self.latencias.items()):
+                for limite, cuenta in zip(BUCKETS, h.cuentas):
+                    lineas.append(
+                        f"http_request_duration_seconds_bucket{{{etiquetas(metodo, ruta, le=limite)}}} {cuenta}"
+                    )
+                lineas.append(
+                    f"http_request_duration_seconds_bucket{{{etiquetas(metodo, ruta, le='+Inf')}}} {h.total}"
+                )
+                lineas.append(f"http_request_duration_seconds_sum{{{etiquetas(metodo, ruta)}}} {h.suma:.6f}")
+                lineas.append(f"http_request_duration_seconds_count{{{etiquetas(metodo, ruta)}}} {h.total}")
+
+            lineas.append("# TYPE http_response_size_bytes summary")
+            for (metodo, ruta), (suma, total) in sorted(self.bytes.items()):
+                lineas.append(f"http_response_size_bytes_sum{{{etiquetas(metodo, ruta)}}} {suma}")
+                lineas.append(f"http_response_size_bytes_count{{{etiquetas(metodo, ruta)}}} {total}")
+
+            lineas.append("# TYPE db_statements_total counter")
+            for (metodo, ruta), (sentencias, _) in sorted(self.sql.items()):
+                lineas.append(f"db_statements_total{{{etiquetas(metodo, ruta)}}} {sentencias}")
+            lineas.append("# TYPE db_statement_duration_seconds_total counter")
+            for (metodo, ruta), (_, segundos) in sorted(self.sql.items()):
+                lineas.append(f"db_statement_duration_seconds_total{{{etiquetas(metodo, ruta)}}} {segundos:.6f}")
+
+        # Los gauges extra (pool de conexiones) son del worker que atiende el scrape
+        etiqueta = f'{{worker="{worker}"}}' if worker is not None else ""
+        for nombre, valor in (extra or {}).items():
+            lineas.append(f"# TYPE {nombre} gauge")
+            lineas.append(f"{nombre}{etiqueta} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+metricas = Metricas()
+
+_volcador_pid = None
+_volcador_lock = threading.Lock()
+
+
+def volcar(directorio):
+    # Escritura atómica: quien suma nunca lee un archivo a medio escribir
+    os.makedirs(directorio, mode=0o700, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(metricas.estado(), f)
+    os.replace(temporal, os.path.join(directorio, f"{os.getpid()}.json"))
+
+
+def iniciar_volcado(directorio):
+    # Un hilo por worker; se arranca en la primera petición, ya después del fork
+    global _volcador_pid
+    with _volcador_lock:
+        if _volcador_pid == os.getpid():
+            return
+        _volcador_pid = os.getpid()
+
+    def volcar_siempre():
+        while True:
+            time.sleep(VOLCADO_SEGUNDOS)
+            volcar(directorio)
+
+    threading.Thread(target=volcar_siempre, name="metricas", daemon=True).start()
+
+
+def exportar(app, extra=None):
+    directorio = app.config["METRICAS_DIR"]
+    if not directorio:
+        return metricas.exportar(extra)
+
+    volcar(directorio)  # el propio estado, al día
+    total = Metricas()
+    for archivo in os.scandir(directorio):
+        if archivo.name.endswith(".json"):
+            with open(archivo.path) as f:
+                total.sumar(json.load(f))
+    return total.exportar(extra, worker=os.getpid())
+
+
+def init_app(app, engine, origenes=()):
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes_sql(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_sql", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def despues_sql(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicio_sql"].pop()
+        # Las sentencias fuera de una petición (arranque, scripts) no se atribuyen a ninguna ruta
+        if has_request_context() and "sql" in g:
+            g.sql.append((statement, duracion))
+
+    @app.before_request
+    def iniciar_medicion():
+        if app.config["METRICAS_DIR"]:
+            iniciar_volcado(app.config["METRICAS_DIR"])
+        g.inicio = time.perf_counter()
+        g.sql = []
+
+    @app.after_request
+    def registrar_medicion(response):
+        if "inicio" not in g:
+            return response
+        duracion = time.perf_counter() - g.inicio
+        segundos_sql = sum(d for _, d in g.sql)
+        ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+
+        metricas.registrar(
+            request.method,
+            ruta,
+            response.status_code,
+            duracion,
+            response.content_length,  # None en respuestas en streaming
+            len(g.sql),
+            segundos_sql
+        )
+
+        response.headers["Server-Timing"] = (
+            f"app;dur={duracion * 1000:.1f}, "
+            f'db;dur={segundos_sql * 1000:.1f};desc="{len(g.sql)} sentencias"'
+        )
+        if origenes:
+            response.headers["Timing-Allow-Origin"] = " ".join(origenes)
+
+        # Log muestreado de peticiones lentas con las sentencias que ejecutaron
+        if duracion * 1000 >= app.config["SLOW_REQUEST_MS"] and random.random() < app.config["SLOW_REQUEST_SAMPLE"]:
+            detalle = "\n".join(f"  {d * 1000:.1f} ms  {s}" for s, d in g.sql)
+            app.logger.warning(
+                "Petición lenta %s %s: %.1f ms, %d sentencias SQL (%.1f ms)\n%s",
+                request.method, request.full_path, duracion * 1000, len(g.sql), segundos_sql * 1000, detalle
+            )
+        return response
@@ -0,0 +1,89 @@
+from datetime import datetime
+from sqlalchemy import (
+    Column, Date, ForeignKey, Index, Integer, MetaData, String, Table, Time, inspect, text
+)
+
+# Migraciones de esquema versionadas e idempotentes. Se ejecutan una vez por
+# deploy (`flask --app app migrar`, fase release del Procfile) y nunca durante
+# una petición. Cada versión aplicada queda registrada en schema_migraciones;
+# agregar una migración = agregar una función al final de MIGRACIONES.
+# Cada migración describe las tablas con su propio MetaData, tal como eran en
+# esa versión, sin leer models.py (que sigue cambiando después).
+
+
+def crear_tablas(conn):
+    # Esquema base; checkfirst lo hace inocuo sobre BDs creadas antes con db.create_all()
+    metadata = MetaData()
+    Table(
+        "clientes", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("nombre", String(120), nullable=False),
+        Column("email", String(120), unique=True, nullable=False),
+        Column("telefono", String(30))
+    )
+    Table(
+        "tatuadores", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("nombre", String(120), nullable=False),
+        Column("estilo", String(200))
+    )
+    Table(
+        "citas", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("fecha", Date, nullable=False),
+        Column("hora_inicio", Time, nullable=False),
+        Column("hora_fin", Time, nullable=False),
+        Column("descripcion", String(200)),
+        Column("imagen_url", String(200)),
+        Column("cliente_id", Integer, ForeignKey("clientes.id"), nullable=False),
+        Column("tatuador_id", Integer, ForeignKey("tatuadores.id"), nullable=False)
+    )
+    metadata.create_all(bind=conn, checkfirst=True)
+
+
+def indice_agenda(conn):
+    # BDs creadas antes del índice compuesto de citas
+    citas = Table("citas", MetaData(), Column("tatuador_id"), Column("fecha"), Column("hora_inicio"))
+    indice = Index("ix_citas_tatuador_fecha_hora", citas.c.tatuador_id, citas.c.fecha, citas.c.hora_inicio)
+    indice.create(bind=conn, checkfirst=True)
+
+
+MIGRACIONES = [
+    (1, "crear_tablas", crear_tablas),
+    (2, "indice_agenda", indice_agenda),
+]
+
+
+def migrar(engine, logger=None):
+    aplicadas = []
+    with engine.begin() as conn:
+        # Un solo proceso migra a la vez: lock consultivo en PostgreSQL; en SQLite
+        # el CREATE TABLE toma el lock de escritura de la BD hasta el commit
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_migraciones'))"))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migraciones ("
+            "version INTEGER PRIMARY KEY, nombre VARCHAR(100) NOT NULL, aplicada_en VARCHAR(32) NOT NULL)"
+        ))
+        hechas = {v for (v,) in conn.execute(text("SELECT version FROM schema_migraciones"))}
+
+        for version, nombre, migracion in MIGRACIONES:
+            if version in hechas:
+                continue
+            migracion(conn)
+            conn.execute(
+                text("INSERT INTO schema_migraciones (version, nombre, aplicada_en) VALUES (:v, :n, :f)"),
+                {"v": version, "n": nombre, "f": datetime.utcnow().isoformat(timespec="seconds")}
+            )
+            aplicadas.append(nombre)
+            if logger:
+                logger.info("Migración %s (%s) aplicada", version, nombre)
+    return aplicadas
+
+
+def pendientes(engine):
+    if not inspect(engine).has_table("schema_migraciones"):
+        return [nombre for _, nombre, _ in MIGRACIONES]
+    with engine.connect() as conn:
+        hechas = {v for (v,) in conn.execute(text("SELECT version FROM schema_migraciones"))}
+    return [nombre for version, nombre, _ in MIGRACIONES if version not in hechas]
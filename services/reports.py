@@ -1 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import Integer, cast, event, extract, func, select
+from sqlalchemy.orm import Session
+from models import db, Cita, Tatuador
+from services.consultas import filtrar_fechas, valor_json
 
+# Motor de reportes: todas las agregaciones se resuelven en la BD (GROUP BY)
+# y los resultados se guardan en una caché con TTL que se invalida tras el
+# commit que crea, actualiza o elimina una Cita o un Tatuador.
+
+PERIODOS = ("dia", "semana", "mes")
+PARAMETROS = ("desde", "hasta", "tatuador_id")
+
+
+class CacheReportes:
+    def __init__(self):
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, ttl, max_entradas, calcular):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada and entrada[0] > ahora:
+                self._datos.move_to_end(clave)
+                return entrada[1]
+
+        valor = calcular()
+        with self._lock:
+            # Al guardar se descartan las entradas vencidas y, si aún sobran, las menos usadas
+            for vieja in [k for k, (vence, _) in self._datos.items() if vence <= ahora]:
+                del self._datos[vieja]
+            self._datos[clave] = (ahora + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > max_entradas:
+                self._datos.popitem(last=False)
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache = CacheReportes()
+
+
+# El flush solo marca la sesión; la caché se vacía recién en after_commit; si se
+# vaciara en el flush, un reporte calculado antes del COMMIT guardaría datos
+# viejos durante todo el TTL. Tatuador también cuenta: los reportes incluyen su nombre
+@event.listens_for(Session, "after_flush")
+def marcar_cambios(session, flush_context):
+    modificados = set(session.new) | set(session.dirty) | set(session.deleted)
+    if any(isinstance(obj, (Cita, Tatuador)) for obj in modificados):
+        session.info["invalidar_reportes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def invalidar_cache(session):
+    if session.info.pop("invalidar_reportes", False):
+        cache.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def descartar_cambios(session):
+    session.info.pop("invalidar_reportes", None)
+
+
+def en_cache(nombre, args, calcular):
+    # La clave solo incluye los filtros que usa filtrar(): otros parámetros no crean entradas nuevas
+    clave = (nombre,) + tuple(args.get(k) or None for k in PARAMETROS)
+    return cache.obtener(
+        clave,
+        current_app.config["REPORTES_CACHE_TTL"],
+        current_app.config["REPORTES_CACHE_MAX_ENTRADAS"],
+        calcular
+    )
+
+
+def es_postgres():
+    return db.engine.dialect.name == "postgresql"
+
+
+def inicio_periodo(periodo):
+    if periodo == "dia":
+        return Cita.fecha
+    if es_postgres():
+        return func.date(func.date_trunc("week" if periodo == "semana" else "month", Cita.fecha))
+    if periodo == "semana":
+        # Lunes de la semana ISO
+        return func.date(Cita.fecha, "-6 days", "weekday 1")
+    return func.date(Cita.fecha, "start of month")
+
+
+def duracion_horas():
+    if es_postgres():
+        return extract("epoch", Cita.hora_fin - Cita.hora_inicio) / 3600.0
+    return (func.julianday(Cita.hora_fin) - func.julianday(Cita.hora_inicio)) * 24
+
+
+def filtrar(query, args):
+    query = filtrar_fechas(query, Cita.fecha, args)
+    tatuador_id = args.get("tatuador_id")
+    if tatuador_id:
+        query = query.filter(Cita.tatuador_id == int(tatuador_id))
+    return query
+
+
+def citas_por_periodo(periodo, args):
+    if periodo not in PERIODOS:
+        raise ValueError(f"Periodo inválido: {periodo}")
+
+    def calcular():
+        inicio = inicio_periodo(periodo).label("periodo")
+        query = select(
+            Cita.tatuador_id,
+            Tatuador.nombre,
+            inicio,
+            func.count(Cita.id).label("total")
+        ).join(Tatuador, Tatuador.id == Cita.tatuador_id).group_by(
+            Cita.tatuador_id, Tatuador.nombre, inicio
+        ).order_by(inicio, Cita.tatuador_id)
+
+        return [
+            {
+                "tatuador_id": f.tatuador_id,
+                "nombre": f.nombre,
+                "periodo": valor_json(f.periodo),
+                "total": f.total
+            }
+            for f in db.session.execute(filtrar(query, args))
+        ]
+
+    return en_cache(f"citas_{periodo}", args, calcular)
+
+
+def horas_ocupadas(args):
+    def calcular():
+        horas = func.sum(duracion_horas())
+        query = select(
+            Cita.tatuador_id,
+            Tatuador.nombre,
+            func.count(Cita.id).label("citas"),
+            horas.label("horas")
+        ).join(Tatuador, Tatuador.id == Cita.tatuador_id).group_by(
+            Cita.tatuador_id, Tatuador.nombre
+        ).order_by(horas.desc())
+
+        return [
+            {
+                "tatuador_id": f.tatuador_id,
+                "nombre": f.nombre,
+                "citas": f.citas,
+                "horas": round(float(f.horas or 0), 2)
+            }
+            for f in db.session.execute(filtrar(query, args))
+        ]
+
+    return en_cache("horas", args, calcular)
+
+
+def franjas_mas_ocupadas(args, limite=10):
+    def calcular():
+        # Día de la semana 0 = domingo ... 6 = sábado en ambos motores
+        if es_postgres():
+            dia = cast(extract("dow", Cita.fecha), Integer)
+            hora = cast(extract("hour", Cita.hora_inicio), Integer)
+        else:
+            dia = cast(func.strftime("%w", Cita.fecha), Integer)
+            hora = cast(func.strftime("%H", Cita.hora_inicio), Integer)
+        dia = dia.label("dia_semana")
+        hora = hora.label("hora")
+        total = func.count(Cita.id).label("total")
+
+        query = select(dia, hora, total).group_by(dia, hora).order_by(
+            total.desc(), dia, hora
+        ).limit(limite)
+
+        return [
+            {"dia_semana": f.dia_semana, "hora": f.hora, "total": f.total}
+            for f in db.session.execute(filtrar(query, args))
+        ]
+
+    return en_cache(f"franjas_{limite}", args, calcular)
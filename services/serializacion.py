@@ -0,0 +1,102 @@
+from sqlalchemy import Date, Time
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from models import db, Cita, Cliente, Tatuador
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el proveedor JSON de Flask
+    orjson = None
+
+# Serialización de solo lectura para los listados: las filas llegan como tuplas
+# de columnas (sin hidratar objetos del ORM) y se convierten en dicts con
+# funciones precalculadas por proyección.
+
+
+def construir_plano(columnas):
+    nombres = [c.key for c in columnas]
+    # Solo las columnas de fecha/hora necesitan conversión a ISO 8601
+    fechas = [c.key for c in columnas if isinstance(c.type, (Date, Time))]
+
+    def construir(fila):
+        datos = dict(zip(nombres, fila))
+        for nombre in fechas:
+            valor = datos[nombre]
+            if valor is not None:
+                datos[nombre] = valor.isoformat()
+        return datos
+    return construir
+
+
+class Proyeccion:
+    def __init__(self, columnas, construir, joins=()):
+        # La primera columna siempre es el id del modelo principal (cursor de paginación)
+        self.columnas = columnas
+        self.construir = construir
+        self.joins = joins
+
+    def consulta(self, modelo):
+        query = db.session.query(*self.columnas).select_from(modelo)
+        for destino, condicion in self.joins:
+            query = query.join(destino, condicion)
+        return query
+
+
+def plana(modelo, campos=None):
+    tabla = modelo.__table__
+    columnas = [tabla.c[c] for c in (campos or tabla.columns.keys())]
+    return Proyeccion(columnas, construir_plano(columnas))
+
+
+def cita(perfil="list"):
+    # "compact" devuelve solo los IDs de las relaciones; "list" anida cliente y tatuador
+    if perfil == "compact":
+        return plana(Cita)
+
+    columnas_cita = list(Cita.__table__.columns)
+    columnas_cliente = list(Cliente.__table__.columns)
+    columnas_tatuador = list(Tatuador.__table__.columns)
+    fin_cita = len(columnas_cita)
+    fin_cliente = fin_cita + len(columnas_cliente)
+    construir_cita = construir_plano(columnas_cita)
+    construir_cliente = construir_plano(columnas_cliente)
+    construir_tatuador = construir_plano(columnas_tatuador)
+
+    def construir(fila):
+        datos = construir_cita(fila[:fin_cita])
+        datos["cliente"] = construir_cliente(fila[fin_cita:fin_cliente])
+        datos["tatuador"] = construir_tatuador(fila[fin_cliente:])
+        return datos
+
+    return Proyeccion(
+        columnas_cita + columnas_cliente + columnas_tatuador,
+        construir,
+        joins=[
+            (Cliente, Cliente.id == Cita.cliente_id),
+            (Tatuador, Tatuador.id == Cita.tatuador_id)
+        ]
+    )
+
+
+class OrjsonProvider(JSONProvider):
+    # Mismo contrato que el proveedor por defecto de Flask, serializando con orjson
+    opciones = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.opciones).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.opciones),
+            mimetype="application/json"
+        )
+
+
+def init_app(app):
+    if app.config["JSON_PROVIDER"] == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = DefaultJSONProvider(app)
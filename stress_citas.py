@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import threading
+from multiprocessing import Process
+
+# Prueba de estrés de reservas: varios procesos (como los workers de gunicorn),
+# cada uno con varios hilos, intentan reservar los mismos horarios del mismo
+# tatuador. Al final no debe existir ningún par de citas solapadas.
+#
+# Uso: python stress_citas.py [procesos] [hilos] [intentos]
+# Por defecto usa un SQLite temporal; con STRESS_DATABASE_URI se puede apuntar a PostgreSQL.
+
+PROCESOS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+HILOS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+INTENTOS = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+if "STRESS_DATABASE_URI" in os.environ:
+    os.environ["SQLALCHEMY_DATABASE_URI"] = os.environ["STRESS_DATABASE_URI"]
+else:
+    ruta = os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{ruta}"
+
+from app import app
+from models import db, Cita, Cliente, Tatuador
+
+
+def preparar():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(Cliente(nombre="Stress", email="stress@example.com"))
+        db.session.add(Tatuador(nombre="Stress"))
+        db.session.commit()
+
+
+def reservar(resultados):
+    client = app.test_client()
+    for i in range(INTENTOS):
+        # Horarios que se pisan entre sí: todos los hilos compiten por las mismas franjas
+        hora = 10 + i % 4
+        r = client.post("/api/citas/", json={
+            "fecha": "2030-01-01",
+            "hora_inicio": f"{hora:02d}:00",
+            "hora_fin": f"{hora + 1:02d}:30",
+            "cliente_id": 1,
+            "tatuador_id": 1
+        })
+        resultados.append(r.status_code)
+
+
+def worker():
+    # Conexiones propias por proceso, igual que un worker de gunicorn tras el fork
+    with app.app_context():
+        db.engine.dispose()
+
+    resultados = []
+    hilos = [threading.Thread(target=reservar, args=(resultados,)) for _ in range(HILOS)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    inesperados = [s for s in resultados if s not in (201, 409)]
+    if inesperados:
+        print(f"❌ Respuestas inesperadas: {inesperados}")
+        sys.exit(1)
+
+
+def contar_solapamientos():
+    with app.app_context():
+        otra = db.aliased(Cita)
+        return db.session.query(Cita.id, otra.id).join(
+            otra,
+            db.and_(
+                Cita.tatuador_id == otra.tatuador_id,
+                Cita.fecha == otra.fecha,
+                Cita.id < otra.id,
+                Cita.hora_inicio < otra.hora_fin,
+                Cita.hora_fin > otra.hora_inicio
+            )
+        ).all(), Cita.query.count()
+
+
+if __name__ == "__main__":
+    preparar()
+    procesos = [Process(target=worker) for _ in range(PROCESOS)]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+
+    solapadas, total = contar_solapamientos()
+    fallidos = [p.exitcode for p in procesos if p.exitcode != 0]
+    if solapadas or fallidos:
+        print(f"❌ {len(solapadas)} pares de citas solapadas ({total} citas creadas)")
+        sys.exit(1)
+    print(f"✅ Sin solapamientos: {total} citas creadas por {PROCESOS * HILOS} clientes concurrentes")
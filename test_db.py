@@ -1,14 +1,27 @@
-import os
-import psycopg2  # o pg8000 si lo instalaste
-from dotenv import load_dotenv
+import time
+from sqlalchemy import text
 
-load_dotenv()
+# Prueba la conexión con la misma configuración (URI y pool) que usa la app.
+# Es un script (python test_db.py): todo va bajo __main__ para que pytest pueda
+# importarlo al recolectar pruebas sin crear la app ni abrir la BD.
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-try:
-    conn = psycopg2.connect(DATABASE_URL)
-    print("✅ Conexión exitosa a PostgreSQL")
-    conn.close()
-except Exception as e:
-    print("❌ Error de conexión:", e)
+def main():
+    from app import app
+    from models import db
+    from services import instrumentacion
+
+    with app.app_context():
+        try:
+            inicio = time.perf_counter()
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            latencia_ms = (time.perf_counter() - inicio) * 1000
+            print(f"✅ Conexión exitosa a {db.engine.url.render_as_string(hide_password=True)} ({latencia_ms:.1f} ms)")
+            print("Pool:", instrumentacion.estado_pool(db.engine, app.extensions["pool_stats"]))
+        except Exception as e:
+            print("❌ Error de conexión:", e)
+
+
+if __name__ == "__main__":
+    main()
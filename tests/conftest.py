@@ -0,0 +1,48 @@
+from datetime import date, time
+
+import pytest
+
+from app import create_app
+from config import Config, opciones_engine
+from models import db, Cita, Cliente, Tatuador
+from services import migraciones, reports
+
+# App sobre un SQLite temporal por prueba: 3 tatuadores, 5 clientes y 20 citas
+
+
+@pytest.fixture
+def app(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'citas.db'}"
+
+    class ConfigPruebas(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = opciones_engine(uri)
+        CACHE_HTTP_BACKEND = "memoria"
+        SLOW_REQUEST_SAMPLE = 0
+
+    app = create_app(ConfigPruebas)
+    with app.app_context():
+        migraciones.migrar(db.engine)
+        tatuadores = [Tatuador(nombre=f"Tatuador {i}", estilo="Blackwork") for i in range(3)]
+        clientes = [Cliente(nombre=f"Cliente {i}", email=f"cliente{i}@example.com") for i in range(5)]
+        db.session.add_all(tatuadores + clientes)
+        db.session.flush()
+        for i in range(20):
+            db.session.add(Cita(
+                cliente_id=clientes[i % 5].id,
+                tatuador_id=tatuadores[i % 3].id,
+                fecha=date(2026, 11, 1 + i),
+                hora_inicio=time(10, 0),
+                hora_fin=time(11, 0),
+                descripcion=f"Cita {i}"
+            ))
+        db.session.commit()
+        db.session.remove()
+    # La caché de reportes es global del proceso: no debe arrastrar datos de otra prueba
+    reports.cache.invalidar()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,75 @@
+import pytest
+
+from models import db
+from services.instrumentacion import assert_num_consultas
+
+# Número de sentencias SQL por endpoint: si un cambio reintroduce un N+1 o una
+# consulta extra, estas pruebas fallan en CI con el listado de sentencias.
+
+
+def contar(app, esperado):
+    with app.app_context():
+        engine = db.engine
+    return assert_num_consultas(engine, esperado)
+
+
+COLUMNAS_CITA = {"id", "fecha", "hora_inicio", "hora_fin", "descripcion", "imagen_url", "cliente_id", "tatuador_id"}
+
+
+@pytest.mark.parametrize("url, claves", [
+    ("/api/citas/", COLUMNAS_CITA | {"cliente", "tatuador"}),
+    ("/api/citas/?perfil=compact", COLUMNAS_CITA),
+    ("/api/citas/?limit=5", COLUMNAS_CITA | {"cliente", "tatuador"}),
+    ("/api/citas/?fields=fecha,hora_inicio", {"id", "fecha", "hora_inicio"}),
+])
+def test_listar_citas_una_consulta(app, client, url, claves):
+    # Cliente y tatuador llegan en el mismo SELECT, sin importar cuántas citas haya
+    with contar(app, 1):
+        respuesta = client.get(url)
+    assert respuesta.status_code == 200
+    assert all(set(cita) == claves for cita in respuesta.get_json())
+
+
+def test_listar_citas_revalidacion_sin_consultas(app, client):
+    etag = client.get("/api/citas/").headers["ETag"]
+    with contar(app, 0):
+        respuesta = client.get("/api/citas/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+
+
+def test_crear_cita(app, client):
+    # Lock de la agenda, validación de solapamiento, INSERT y recarga con JOIN
+    with contar(app, 4):
+        respuesta = client.post("/api/citas/", json={
+            "fecha": "2026-12-24",
+            "hora_inicio": "12:00",
+            "hora_fin": "13:00",
+            "cliente_id": 1,
+            "tatuador_id": 1
+        })
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()["cita"]["tatuador"]["id"] == 1
+
+
+def test_actualizar_cita(app, client):
+    # Carga, lock, solapamiento, UPDATE y recarga con JOIN
+    with contar(app, 5):
+        respuesta = client.put("/api/citas/1", json={"hora_inicio": "15:00", "hora_fin": "16:00"})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["cita"]["hora_inicio"] == "15:00:00"
+
+
+def test_actualizar_cita_solo_descripcion(app, client):
+    # Sin cambio de horario no hay lock ni validación de solapamiento
+    with contar(app, 3):
+        respuesta = client.put("/api/citas/1", json={"descripcion": "Retoque"})
+    assert respuesta.status_code == 200
+
+
+def test_exportar_xml(app, client):
+    # Una sola sentencia (totales con funciones de ventana), independiente del número de filas
+    with contar(app, 1):
+        respuesta = client.get("/api/citas/xml")
+        cuerpo = respuesta.get_data(as_text=True)
+    assert respuesta.status_code == 200
+    assert cuerpo.count("<cita ") == 20
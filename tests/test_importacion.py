@@ -0,0 +1,61 @@
+from models import db, Cita, Cliente
+
+
+def cita(**campos):
+    return {
+        "fecha": "2026-12-01",
+        "hora_inicio": "10:00",
+        "hora_fin": "11:00",
+        "cliente_id": 1,
+        "tatuador_id": 1,
+        **campos
+    }
+
+
+def test_citas_bulk_texto_invalido(app, client):
+    # Un campo de texto con otro tipo es un error de esa fila, no un 500 que descarta el lote
+    respuesta = client.post("/api/citas/bulk", json=[
+        cita(descripcion=["x"]),
+        cita(hora_inicio="12:00", hora_fin="13:00", imagen_url={"url": "x"}),
+        cita(hora_inicio="14:00", hora_fin="15:00", descripcion="Válida")
+    ])
+    assert respuesta.status_code == 207
+    datos = respuesta.get_json()
+    assert datos["insertados"] == 1
+    assert [e["fila"] for e in datos["errores"]] == [0, 1]
+    assert "descripcion" in datos["errores"][0]["error"]
+    assert "imagen_url" in datos["errores"][1]["error"]
+    with app.app_context():
+        assert db.session.query(Cita).filter_by(descripcion="Válida").count() == 1
+
+
+def test_error_a_mitad_del_stream_reporta_lotes_confirmados(app, client):
+    # El cuerpo se decodifica por bloques: el byte inválido llega después de varios lotes
+    app.config["IMPORTACION_LOTE"] = 100
+    lineas = b"".join(
+        b'{"nombre": "Nuevo", "email": "nuevo%d@example.com"}\n' % i for i in range(2000)
+    )
+    respuesta = client.post(
+        "/api/clientes/bulk",
+        data=lineas + b'{"nombre": "\xff"}\n',
+        content_type="application/x-ndjson"
+    )
+    assert respuesta.status_code == 400
+    datos = respuesta.get_json()
+    assert "UTF-8" in datos["error"]
+    assert 0 < datos["insertados"] < 2000
+    with app.app_context():
+        assert db.session.query(Cliente).filter(Cliente.email.like("nuevo%")).count() == datos["insertados"]
+
+
+def test_tatuadores_bulk_id_requiere_upsert(app, client):
+    filas = [{"id": 1, "nombre": "Renombrado"}, {"id": True, "nombre": "Bool"}, {"id": 2.0, "nombre": "Float"}]
+    respuesta = client.post("/api/tatuadores/bulk", json=filas)
+    assert respuesta.status_code == 207
+    errores = respuesta.get_json()["errores"]
+    assert "upsert" in errores[0]["error"]
+    assert [e["error"] for e in errores[1:]] == ["El campo 'id' debe ser un entero"] * 2
+
+    respuesta = client.post("/api/tatuadores/bulk?upsert=1", json=filas[:1])
+    assert respuesta.get_json()["actualizados"] == 1
+    assert client.get("/api/tatuadores/?limit=1").get_json()[0]["nombre"] == "Renombrado"
@@ -0,0 +1,28 @@
+from models import db, Tatuador
+from services import reports
+
+
+def test_cache_se_vacia_despues_del_commit(app, client):
+    client.get("/api/reportes/horas")
+    assert reports.cache._datos
+
+    with app.app_context():
+        tatuador = db.session.get(Tatuador, 1)
+        tatuador.nombre = "Renombrado"
+        db.session.flush()
+        # Antes del COMMIT la caché sigue intacta: otro request no puede guardar datos sin confirmar
+        assert reports.cache._datos
+        db.session.commit()
+        assert not reports.cache._datos
+
+    horas = client.get("/api/reportes/horas").get_json()
+    assert "Renombrado" in {f["nombre"] for f in horas}
+
+
+def test_rollback_no_vacia_la_cache(app, client):
+    client.get("/api/reportes/horas")
+    with app.app_context():
+        db.session.get(Tatuador, 1).nombre = "Descartado"
+        db.session.flush()
+        db.session.rollback()
+    assert reports.cache._datos